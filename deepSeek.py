@@ -1,23 +1,151 @@
 import os
+import re
+import asyncio
+import orjson
 import requests
+import math
+import hashlib
 import datetime
-from together import Together
+from itertools import chain
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from together import AsyncTogether
 from dotenv import load_dotenv
+from diskcache import Cache
 from rich.console import Console
 from rich.table import Table
 
-# Load API keys from .env file
-load_dotenv()
+# Load API keys from .env file unless they are already set in the environment
+if not (os.getenv("TOGETHER_API_KEY") and os.getenv("NEWS_API_KEY")):
+    load_dotenv()
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
+# NewsAPI results are cached on disk for a short time so repeated runs skip the request
+NEWS_CACHE_TTL = 600  # seconds
+_NEWS_CACHE = Cache(os.path.expanduser("~/.cache/newsapi/deepseek"))
+
+# Article summaries are cached on disk for a week, keyed by article URL and publish time
+SUMMARY_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+_SUMMARY_CACHE = Cache(os.path.expanduser("~/.cache/deepseek_summaries/deepseek"))
+
+# Shared HTTP session so NewsAPI connections are kept alive and reused
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# NewsAPI pagination: articles per page and how many pages to fetch at most
+NEWS_PAGE_SIZE = 100
+MAX_NEWS_PAGES = 5
+
+# Article fields the scripts use; everything else NewsAPI returns is dropped
+NEWS_ARTICLE_KEYS = ("title", "description", "content", "url", "publishedAt", "source")
+
+# Maximum number of summarisation requests in flight at once (Together rate limits)
+MAX_CONCURRENT_REQUESTS = 8
+
+# Prompt pieces shared by every summarisation request
+SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant summarising financial news for market research in simple language."
+}
+PROMPT_PREFIX = (
+    "Please analyse the following news article and summarise it in 2-3 sentences using simple language. "
+    "Highlight the key points and explain if this news is good or bad for the company's financial health. "
+    "If any technical term appears, please explain it in brackets (). Also, include your thinking process "
+    "(i.e. your analysis and reasoning) in your output.\n\n"
+)
+ARTICLE_TMPL = "Title: {title}\nDescription: {description}\nContent: {content}\nURL: {url}\nPublishedAt: {publishedAt}"
+# Article fields used in the prompt and their fallbacks when missing
+ARTICLE_FIELDS = (("title", "N/A"), ("description", "N/A"), ("content", "N/A"), ("url", ""), ("publishedAt", "N/A"))
+# Long fields are trimmed to cap prompt tokens; NewsAPI's "[+1234 chars]" marker is dropped
+MAX_DESCRIPTION_CHARS = 400
+MAX_CONTENT_CHARS = 800
+_CHARS_RE = re.compile(r"\s*\[\+\d+\s+chars\]\s*$")
+
+# Console and table layout are set up once and reused by every display_news call
+_CONSOLE = Console()
+_COLUMNS = (
+    ("Date", {"style": "dim", "width": 12}),
+    ("Source", {"style": "cyan", "width": 15}),
+    ("Title", {"style": "bold", "width": 40}),
+    ("Analysis (Summary & Thinking)", {"style": "white", "width": 80}),
+)
+
 # Initialize Together AI client
-client = Together(api_key=TOGETHER_API_KEY)
+client = AsyncTogether(api_key=TOGETHER_API_KEY)
+
+def _canon_url(url):
+    """
+    Normalises a URL for duplicate detection: lower-case scheme and host,
+    no trailing slash or fragment, and no utm_* tracking parameters.
+    URLs that cannot be parsed are only lower-cased.
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url.lower()
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+def dedupe_articles(articles):
+    """
+    Removes duplicate articles so each story is summarised only once.
+    An article is a duplicate if its canonical URL or its normalised title was already seen;
+    the first occurrence is kept, preserving NewsAPI's ordering.
+    """
+    seen_urls = set()
+    seen_titles = set()
+    unique_articles = []
+    for article in articles:
+        url_key = _canon_url(article.get("url") or "")
+        title = (article.get("title") or "").strip().lower()
+        title_key = hashlib.sha1(title.encode()).digest()[:8] if title else None
+        if url_key in seen_urls or title_key in seen_titles:
+            continue
+        if url_key:
+            seen_urls.add(url_key)
+        if title_key:
+            seen_titles.add(title_key)
+        unique_articles.append(article)
+    return unique_articles
+
+def _slim_articles(data):
+    """
+    Returns the articles from a NewsAPI response, keeping only the fields in NEWS_ARTICLE_KEYS.
+    """
+    return [{key: article[key] for key in NEWS_ARTICLE_KEYS if key in article} for article in data.get("articles", [])]
+
+def _fetch_news_page(url, params, page):
+    """
+    Fetches one additional page of NewsAPI results.
+    Returns an empty list if the page cannot be fetched.
+    """
+    try:
+        response = _SESSION.get(url, params={**params, "page": page}, timeout=(3.05, 10))
+    except requests.RequestException:
+        return []
+    if response.status_code != 200:
+        return []
+    try:
+        data = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return []
+    return _slim_articles(data)
 
 def get_company_news(company_name, num_days=10):
     """
     Fetches news articles for the company using NewsAPI.
     """
+    cache_key = (company_name.lower(), num_days, datetime.date.today().isoformat())
+    articles = _NEWS_CACHE.get(cache_key)
+    if articles is not None:
+        return articles
+
     end_date = datetime.datetime.today()
     start_date = end_date - datetime.timedelta(days=num_days)
 
@@ -27,110 +155,122 @@ def get_company_news(company_name, num_days=10):
         "from": start_date.strftime("%Y-%m-%d"),
         "to": end_date.strftime("%Y-%m-%d"),
         "sortBy": "popularity",
+        "pageSize": NEWS_PAGE_SIZE,
         "apiKey": NEWS_API_KEY
     }
-    response = requests.get(news_api_url, params=params)
+    try:
+        response = _SESSION.get(news_api_url, params=params, timeout=(3.05, 10))
+    except requests.RequestException:
+        print("Error fetching news from NewsAPI.")
+        return []
 
     if response.status_code != 200:
         print("Error fetching news from NewsAPI.")
         return []
 
-    data = response.json()
+    data = orjson.loads(response.content)
     if data.get("status") != "ok":
         print("NewsAPI did not return a successful response.")
         return []
 
-    articles = data.get("articles", [])
+    articles = _slim_articles(data)
+
+    # Fetch any remaining pages concurrently
+    pages = min(MAX_NEWS_PAGES, math.ceil(data.get("totalResults", 0) / NEWS_PAGE_SIZE))
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=MAX_NEWS_PAGES) as executor:
+            futures = [executor.submit(_fetch_news_page, news_api_url, params, page) for page in range(2, pages + 1)]
+            articles = list(chain(articles, chain.from_iterable(future.result() for future in futures)))
+
+    # Drop articles repeated across pages or syndicated by several sources
+    articles = dedupe_articles(articles)
+
     if not articles:
         print("No news found for the given query and date range.")
+    else:
+        _NEWS_CACHE.set(cache_key, articles, expire=NEWS_CACHE_TTL)
     return articles
 
-def summarize_news(news_articles):
+def _article_prompt_text(article):
     """
-    Sends each news article to DeepSeek R1 LLM to summarise and analyze it.
-    The prompt instructs the LLM to use simple language, explain technical terms in brackets (),
-    include the important points, and indicate if the news is good or bad for the company's financial health.
-    Also, the LLM's internal thinking process is included in the response.
+    Fills ARTICLE_TMPL for an article, trimming the description and content to keep the prompt short.
     """
-    summaries = []
+    fields = {key: article.get(key, default) for key, default in ARTICLE_FIELDS}
+    fields["description"] = (article.get("description") or "N/A")[:MAX_DESCRIPTION_CHARS]
+    fields["content"] = _CHARS_RE.sub("", article.get("content") or "N/A")[:MAX_CONTENT_CHARS]
+    return ARTICLE_TMPL.format_map(fields)
 
-    for article in news_articles:
+def _summary_cache_key(article):
+    """
+    Returns the summary cache key for an article: a hash of its URL and publish time.
+    """
+    return hashlib.sha256(((article.get("url") or "") + (article.get("publishedAt") or "")).encode()).hexdigest()
+
+async def _summarize_one(article, semaphore):
+    """
+    Sends a single news article to DeepSeek R1 LLM and returns its summary entry.
+    The semaphore limits how many requests are in flight at the same time.
+    """
+    # Summaries are cached on disk, so articles seen in an earlier run skip the LLM call
+    cache_key = _summary_cache_key(article)
+    response_text = _SUMMARY_CACHE.get(cache_key)
+    if not response_text:
         # Combine available details of the article
-        article_text = (
-            f"Title: {article.get('title', 'N/A')}\n"
-            f"Description: {article.get('description', 'N/A')}\n"
-            f"Content: {article.get('content', 'N/A')}\n"
-            f"URL: {article.get('url', '')}\n"
-            f"PublishedAt: {article.get('publishedAt', 'N/A')}"
-        )
-
-        prompt = (
-            "Please analyse the following news article and summarise it in 2-3 sentences using simple language. "
-            "Highlight the key points and explain if this news is good or bad for the company's financial health. "
-            "If any technical term appears, please explain it in brackets (). Also, include your thinking process "
-            "(i.e. your analysis and reasoning) in your output.\n\n"
-            f"{article_text}"
-        )
-
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant summarising financial news for market research in simple language."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-
-        # Call DeepSeek R1 LLM and collect the streaming response
-        response_text = ""
+        article_text = _article_prompt_text(article)
+        messages = [SYSTEM_MSG, {"role": "user", "content": PROMPT_PREFIX + article_text}]
+
+        # Call DeepSeek R1 LLM; the output is only shown once complete, so no streaming
         try:
-            response = client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",
-                messages=messages,
-                max_tokens=300,
-                temperature=0.7,
-                top_p=1,
-                top_k=60,
-                repetition_penalty=2,
-                stop=["<｜end▁of▁sentence｜>"],
-                stream=True
-            )
-            for token in response:
-                if hasattr(token, 'choices'):
-                    response_text += token.choices[0].delta.content
+            async with semaphore:
+                response = await client.chat.completions.create(
+                    model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",
+                    messages=messages,
+                    max_tokens=300,
+                    temperature=0.3,
+                    top_p=0.9,
+                    top_k=40,
+                    repetition_penalty=1.1,
+                    stop=["<｜end▁of▁sentence｜>"],
+                    stream=False
+                )
+            response_text = response.choices[0].message.content or ""
+            _SUMMARY_CACHE.set(cache_key, response_text.strip(), expire=SUMMARY_CACHE_TTL)
         except Exception as e:
             response_text = f"Error during summarisation: {e}"
 
-        summaries.append({
-            "title": article.get("title", "N/A"),
-            "publishedAt": article.get("publishedAt", "N/A"),
-            "source": article.get("source", {}).get("name", "Unknown"),
-            "summary": response_text.strip(),
-            "url": article.get("url", "")
-        })
+    return {
+        "title": article.get("title", "N/A"),
+        "publishedAt": article.get("publishedAt", "N/A"),
+        "source": article.get("source", {}).get("name", "Unknown"),
+        "summary": response_text.strip(),
+        "url": article.get("url", "")
+    }
 
-    return summaries
+async def summarize_news(news_articles):
+    """
+    Sends each news article to DeepSeek R1 LLM to summarise and analyze it.
+    The prompt instructs the LLM to use simple language, explain technical terms in brackets (),
+    include the important points, and indicate if the news is good or bad for the company's financial health.
+    Also, the LLM's internal thinking process is included in the response.
+    Articles are summarised concurrently; the returned list keeps the input order.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return await asyncio.gather(*[_summarize_one(article, semaphore) for article in news_articles])
 
 def display_news(news_summaries):
     """
     Displays the summarised news in a structured table.
     """
-    console = Console()
     table = Table(title="Company News Analysis", show_header=True, header_style="bold magenta")
-
-    table.add_column("Date", style="dim", width=12)
-    table.add_column("Source", style="cyan", width=15)
-    table.add_column("Title", style="bold", width=40)
-    table.add_column("Analysis (Summary & Thinking)", style="white", width=80)
+    for name, options in _COLUMNS:
+        table.add_column(name, **options)
 
     for news in news_summaries:
         # Combine the summary and include the URL for reference
         combined_text = f"{news['summary']}\n\n[link={news['url']}]Read More[/link]"
         table.add_row(news["publishedAt"], news["source"], news["title"], combined_text)
 
-    console.print(table)
+    _CONSOLE.print(table)
 
 if __name__ == "__main__":
     company = input("Enter company name: ")
@@ -146,5 +286,5 @@ if __name__ == "__main__":
         print("No news found for the specified company and date range.")
     else:
         print("Summarising and analysing news articles...")
-        news_summaries = summarize_news(news_articles)
+        news_summaries = asyncio.run(summarize_news(news_articles))
         display_news(news_summaries)
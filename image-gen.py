@@ -1,14 +1,33 @@
 import os
 import base64
-from together import Together
+import asyncio
+import hashlib
+import shutil
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from together import AsyncTogether
 from dotenv import load_dotenv
 
-# Load API key from .env file
-load_dotenv()
+# Load API key from .env file unless it is already set in the environment
+if not os.getenv("TOGETHER_API_KEY"):
+    load_dotenv()
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 
+# Shared HTTP session for downloading generated images
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# Fixed image generation settings
+IMAGE_MODEL = "black-forest-labs/FLUX.1-schnell-Free"
+IMAGE_STEPS = 4   # Fixed steps as recommended.
+IMAGE_SEED = 0    # Using 0 for deterministic results; you can try -1 for randomness.
+
+# Maximum number of image requests in flight at once (service concurrency limit)
+MAX_CONCURRENT_REQUESTS = 4
+
 # Initialize Together AI client
-client = Together(api_key=TOGETHER_API_KEY)
+client = AsyncTogether(api_key=TOGETHER_API_KEY)
 
 def choose_image_ratio():
     """
@@ -33,25 +52,28 @@ def choose_image_ratio():
         print("Invalid choice. Defaulting to 4:3 ratio (1024x768).")
         return 1024, 768
 
-def generate_image(prompt, width, height):
+async def generate_image(prompt, width, height, semaphore):
     """
     Generate an image using Together AI's image generation API.
     Uses steps=4 (as recommended) and seed=0.
-    Returns the base64 image data.
+    Asks for a URL rather than base64 so the image can be streamed to disk.
+    Returns the generated image entry (with either a url or b64_json).
+    The semaphore limits how many requests are in flight at the same time.
     """
     try:
-        response = client.images.generate(
-            prompt=prompt,
-            model="black-forest-labs/FLUX.1-schnell-Free",
-            width=width,
-            height=height,
-            steps=4,          # Fixed steps as recommended.
-            n=1,
-            seed=0,           # Using 0 for deterministic results; you can try -1 for randomness.
-            response_format="b64_json"
-        )
+        async with semaphore:
+            response = await client.images.generate(
+                prompt=prompt,
+                model=IMAGE_MODEL,
+                width=width,
+                height=height,
+                steps=IMAGE_STEPS,
+                n=1,
+                seed=IMAGE_SEED,
+                response_format="url"
+            )
         if response.data and len(response.data) > 0:
-            return response.data[0].b64_json
+            return response.data[0]
         else:
             print("No image data received.")
             return None
@@ -59,31 +81,73 @@ def generate_image(prompt, width, height):
         print("Error during image generation:", e)
         return None
 
-def save_image(b64_image_data, filename="generated_image.png"):
+async def generate_images(prompts, width, height):
+    """
+    Generate one image per prompt concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+    Returns the image entries in the same order as the prompts (None for failures).
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return await asyncio.gather(*[generate_image(prompt, width, height, semaphore) for prompt in prompts])
+
+def save_image(image, filename="generated_image.png"):
     """
-    Decodes the base64 image data and saves it as a PNG file.
+    Saves the generated image as a PNG file.
+    If the API returned a URL the image is streamed straight to disk,
+    otherwise the base64 image data is decoded and written.
     """
     try:
-        image_bytes = base64.b64decode(b64_image_data)
-        with open(filename, "wb") as img_file:
-            img_file.write(image_bytes)
+        if getattr(image, "url", None):
+            with _SESSION.get(image.url, stream=True, timeout=(3.05, 30)) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                with open(filename, "wb") as img_file:
+                    shutil.copyfileobj(response.raw, img_file)
+        else:
+            image_bytes = base64.b64decode(image.b64_json)
+            with open(filename, "wb") as img_file:
+                img_file.write(image_bytes)
         print(f"✅ Image saved as: {filename}")
     except Exception as e:
         print("Error saving image:", e)
 
-def main():
-    user_prompt = input("\nEnter a description for the image you want: ").strip()
-    # Directly use the user's prompt for image generation
-    print("\nUsing prompt:", user_prompt)
+def read_prompts():
+    """
+    Asks for an image description, or the path of a text file with one prompt per line.
+    Returns the list of non-empty prompts.
+    """
+    entry = input("\nEnter a description for the image you want (or a file with one prompt per line): ").strip()
+    if os.path.isfile(entry):
+        with open(entry, encoding="utf-8") as prompt_file:
+            return [line.strip() for line in prompt_file if line.strip()]
+    return [entry]
+
+def image_filename(index, prompt, batch):
+    """
+    Returns the output filename for the prompt at the given position.
+    A single image keeps the default name; batch images get their index and a prompt hash,
+    so repeated prompts do not overwrite each other.
+    """
+    if not batch:
+        return "generated_image.png"
+    return f"generated_image_{index:03d}_{hashlib.md5(prompt.encode()).hexdigest()[:8]}.png"
+
+def main(prompts=None):
+    if prompts is None:
+        prompts = read_prompts()
+    # Directly use the user's prompts for image generation
+    for prompt in prompts:
+        print("\nUsing prompt:", prompt)
     
     width, height = choose_image_ratio()
-    print(f"\n⏳ Generating image at {width}x{height} resolution...")
+    print(f"\n⏳ Generating {len(prompts)} image(s) at {width}x{height} resolution...")
     
-    b64_data = generate_image(user_prompt, width, height)
-    if b64_data:
-        save_image(b64_data)
-    else:
-        print("❌ Failed to generate image.")
+    images = asyncio.run(generate_images(prompts, width, height))
+    batch = len(prompts) > 1
+    for index, (prompt, image) in enumerate(zip(prompts, images)):
+        if image:
+            save_image(image, image_filename(index, prompt, batch))
+        else:
+            print(f"❌ Failed to generate image for: {prompt}")
 
 if __name__ == "__main__":
     main()
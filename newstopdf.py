@@ -1,17 +1,172 @@
 import os
+import re
+import html
+import asyncio
+import orjson
 import requests
+import math
+import hashlib
 import datetime
-from together import Together
+from itertools import chain
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from together import AsyncTogether
 from dotenv import load_dotenv
-from fpdf import FPDF
+from diskcache import Cache
 
-# Load API keys from .env file
-load_dotenv()
+# Load API keys from .env file unless they are already set in the environment
+if not (os.getenv("TOGETHER_API_KEY") and os.getenv("NEWS_API_KEY")):
+    load_dotenv()
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
+# NewsAPI results are cached on disk for a short time so repeated runs skip the request
+NEWS_CACHE_TTL = 600  # seconds
+_NEWS_CACHE = Cache(os.path.expanduser("~/.cache/newsapi/newstopdf"))
+
+# Article summaries are cached on disk for a week, keyed by article URL and publish time
+SUMMARY_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+_SUMMARY_CACHE = Cache(os.path.expanduser("~/.cache/deepseek_summaries/newstopdf"))
+
+# Shared HTTP session so NewsAPI connections are kept alive and reused
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# NewsAPI pagination: articles per page and how many pages to fetch at most
+NEWS_PAGE_SIZE = 100
+MAX_NEWS_PAGES = 5
+
+# Article fields the scripts use; everything else NewsAPI returns is dropped
+NEWS_ARTICLE_KEYS = ("title", "description", "content", "url", "publishedAt", "source")
+
+# Maximum number of summarisation requests in flight at once (Together rate limits)
+MAX_CONCURRENT_REQUESTS = 8
+
+# Static parts of the HTML report; HTML_HEADER is filled in with str.format
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{company_name} - Investment News Insights</title>
+<style>
+body {{
+    font-family: Arial, sans-serif;
+    margin: 20px;
+}}
+table {{
+    border-collapse: collapse;
+    width: 100%;
+}}
+th, td {{
+    border: 1px solid #ddd;
+    padding: 8px;
+}}
+th {{
+    background-color: #f2f2f2;
+    text-align: left;
+}}
+</style>
+</head>
+<body>
+<h2>{company_name} - Investment News Insights</h2>
+<table>
+<tr>
+<th>Date</th>
+<th>Source</th>
+<th>Title</th>
+<th>Summary</th>
+<th>URL</th>
+</tr>
+"""
+HTML_FOOTER = """
+</table>
+</body>
+</html>
+"""
+
+# Prompt pieces shared by every summarisation request
+SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant providing investment insights by summarising news articles in simple language."
+}
+PROMPT_PREFIX = (
+    "Please summarise the following news article in 2-3 simple sentences. "
+    "Highlight the key news points that a trader or stock broker might use to assess investment potential. "
+    "Explain any technical term in brackets () and do not include any internal analysis or 'thinking' text.\n\n"
+)
+ARTICLE_TMPL = "Title: {title}\nDescription: {description}\nContent: {content}\nURL: {url}\nPublishedAt: {publishedAt}"
+# Article fields used in the prompt and their fallbacks when missing
+ARTICLE_FIELDS = (("title", "N/A"), ("description", "N/A"), ("content", "N/A"), ("url", ""), ("publishedAt", "N/A"))
+# Long fields are trimmed to cap prompt tokens; NewsAPI's "[+1234 chars]" marker is dropped
+MAX_DESCRIPTION_CHARS = 400
+MAX_CONTENT_CHARS = 800
+_CHARS_RE = re.compile(r"\s*\[\+\d+\s+chars\]\s*$")
+
 # Initialize Together AI client
-client = Together(api_key=TOGETHER_API_KEY)
+client = AsyncTogether(api_key=TOGETHER_API_KEY)
+
+def _canon_url(url):
+    """
+    Normalises a URL for duplicate detection: lower-case scheme and host,
+    no trailing slash or fragment, and no utm_* tracking parameters.
+    URLs that cannot be parsed are only lower-cased.
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url.lower()
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+def dedupe_articles(articles):
+    """
+    Removes duplicate articles so each story is summarised only once.
+    An article is a duplicate if its canonical URL or its normalised title was already seen;
+    the first occurrence is kept, preserving NewsAPI's ordering.
+    """
+    seen_urls = set()
+    seen_titles = set()
+    unique_articles = []
+    for article in articles:
+        url_key = _canon_url(article.get("url") or "")
+        title = (article.get("title") or "").strip().lower()
+        title_key = hashlib.sha1(title.encode()).digest()[:8] if title else None
+        if url_key in seen_urls or title_key in seen_titles:
+            continue
+        if url_key:
+            seen_urls.add(url_key)
+        if title_key:
+            seen_titles.add(title_key)
+        unique_articles.append(article)
+    return unique_articles
+
+def _slim_articles(data):
+    """
+    Returns the articles from a NewsAPI response, keeping only the fields in NEWS_ARTICLE_KEYS.
+    """
+    return [{key: article[key] for key in NEWS_ARTICLE_KEYS if key in article} for article in data.get("articles", [])]
+
+def _fetch_news_page(url, params, page):
+    """
+    Fetches one additional page of NewsAPI results.
+    Returns an empty list if the page cannot be fetched.
+    """
+    try:
+        response = _SESSION.get(url, params={**params, "page": page}, timeout=(3.05, 10))
+    except requests.RequestException:
+        return []
+    if response.status_code != 200:
+        return []
+    try:
+        data = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return []
+    return _slim_articles(data)
 
 def get_company_news(company_name, num_days=10):
     """
@@ -20,6 +175,11 @@ def get_company_news(company_name, num_days=10):
      - Language: English only
      - And force results to be India-centric by including 'India' in the query.
     """
+    cache_key = (company_name.lower(), num_days, datetime.date.today().isoformat())
+    articles = _NEWS_CACHE.get(cache_key)
+    if articles is not None:
+        return articles
+
     end_date = datetime.datetime.today()
     start_date = end_date - datetime.timedelta(days=num_days)
     
@@ -32,192 +192,135 @@ def get_company_news(company_name, num_days=10):
         "to": end_date.strftime("%Y-%m-%d"),
         "language": "en",
         "sortBy": "popularity",
+        "pageSize": NEWS_PAGE_SIZE,
         "apiKey": NEWS_API_KEY
     }
     
-    response = requests.get(url, params=params)
+    try:
+        response = _SESSION.get(url, params=params, timeout=(3.05, 10))
+    except requests.RequestException:
+        print("Error fetching news from NewsAPI.")
+        return []
     if response.status_code != 200:
         print("Error fetching news from NewsAPI.")
         return []
     
-    data = response.json()
+    data = orjson.loads(response.content)
     if data.get("status") != "ok":
         print("NewsAPI did not return a successful response.")
         return []
     
-    articles = data.get("articles", [])
+    articles = _slim_articles(data)
+
+    # Fetch any remaining pages concurrently
+    pages = min(MAX_NEWS_PAGES, math.ceil(data.get("totalResults", 0) / NEWS_PAGE_SIZE))
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=MAX_NEWS_PAGES) as executor:
+            futures = [executor.submit(_fetch_news_page, url, params, page) for page in range(2, pages + 1)]
+            articles = list(chain(articles, chain.from_iterable(future.result() for future in futures)))
+
+    # Drop articles repeated across pages or syndicated by several sources
+    articles = dedupe_articles(articles)
+
     if not articles:
         print("No news found for the specified company and date range.")
+    else:
+        _NEWS_CACHE.set(cache_key, articles, expire=NEWS_CACHE_TTL)
     return articles
 
-def summarize_article(article):
+def _article_prompt_text(article):
+    """
+    Fills ARTICLE_TMPL for an article, trimming the description and content to keep the prompt short.
+    """
+    fields = {key: article.get(key, default) for key, default in ARTICLE_FIELDS}
+    fields["description"] = (article.get("description") or "N/A")[:MAX_DESCRIPTION_CHARS]
+    fields["content"] = _CHARS_RE.sub("", article.get("content") or "N/A")[:MAX_CONTENT_CHARS]
+    return ARTICLE_TMPL.format_map(fields)
+
+def _summary_cache_key(article):
+    """
+    Returns the summary cache key for an article: a hash of its URL and publish time.
+    """
+    return hashlib.sha256(((article.get("url") or "") + (article.get("publishedAt") or "")).encode()).hexdigest()
+
+async def summarize_article(article, semaphore):
     """
     Summarise a news article using DeepSeek R1.
     The prompt instructs the LLM to provide a 2–3 sentence summary in simple language,
     highlight key news points useful for traders or stock brokers,
     and not include any internal 'thinking' or analysis text.
+    The semaphore limits how many requests are in flight at the same time.
+    Summaries are cached on disk, so articles seen in an earlier run skip the LLM call.
     """
-    article_text = (
-        f"Title: {article.get('title', 'N/A')}\n"
-        f"Description: {article.get('description', 'N/A')}\n"
-        f"Content: {article.get('content', 'N/A')}\n"
-        f"URL: {article.get('url', '')}\n"
-        f"PublishedAt: {article.get('publishedAt', 'N/A')}"
-    )
-    
-    prompt = (
-        "Please summarise the following news article in 2-3 simple sentences. "
-        "Highlight the key news points that a trader or stock broker might use to assess investment potential. "
-        "Explain any technical term in brackets () and do not include any internal analysis or 'thinking' text.\n\n"
-        f"{article_text}"
-    )
-    
-    messages = [
-        {
-            "role": "system",
-            "content": "You are a helpful assistant providing investment insights by summarising news articles in simple language."
-        },
-        {
-            "role": "user",
-            "content": prompt
-        }
-    ]
+    cache_key = _summary_cache_key(article)
+    cached = _SUMMARY_CACHE.get(cache_key)
+    if cached:
+        return cached
+
+    article_text = _article_prompt_text(article)
+    messages = [SYSTEM_MSG, {"role": "user", "content": PROMPT_PREFIX + article_text}]
     
-    summary_text = ""
     try:
-        response = client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",
-            messages=messages,
-            max_tokens=300,
-            temperature=0.7,
-            top_p=1,
-            top_k=60,
-            repetition_penalty=2,
-            stop=["<｜end▁of▁sentence｜>"],
-            stream=True
-        )
-        for token in response:
-            if hasattr(token, 'choices'):
-                summary_text += token.choices[0].delta.content
+        async with semaphore:
+            response = await client.chat.completions.create(
+                model="deepseek-ai/DeepSeek-R1-Distill-Llama-70B-free",
+                messages=messages,
+                max_tokens=300,
+                temperature=0.3,
+                top_p=0.9,
+                top_k=40,
+                repetition_penalty=1.1,
+                stop=["<｜end▁of▁sentence｜>"],
+                stream=False
+            )
+        summary_text = response.choices[0].message.content or ""
+        _SUMMARY_CACHE.set(cache_key, summary_text.strip(), expire=SUMMARY_CACHE_TTL)
     except Exception as e:
         summary_text = f"Error during summarisation: {e}"
     
     return summary_text.strip()
 
-def generate_pdf(company_name, news_data):
+async def summarize_articles(articles):
     """
-    Generate a PDF file (companyname.pdf) with a table of news data.
-    Each article includes: Published Date, Source, Title, Summary, and URL.
-    Uses a Unicode font to support all characters.
+    Summarise all articles concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+    Returns the summaries in the same order as the articles.
     """
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Add a Unicode font. If you have DejaVuSans.ttf, place it in the same directory.
-    # If you don't have a bold version, we'll use the regular style.
-    try:
-        pdf.add_font('DejaVu', '', 'DejaVuSans.ttf', uni=True)
-        # Try using the same font for bold.
-        pdf.add_font('DejaVu', 'B', 'DejaVuSans.ttf', uni=True)
-        pdf.set_font("DejaVu", "B", 16)
-    except Exception as e:
-        raise RuntimeError("PDF font error: " + str(e))
-
-    pdf.cell(0, 10, f"{company_name} - Investment News Insights", ln=True, align="C")
-    pdf.ln(5)
-
-    # Set headers and column widths
-    headers = ["Date", "Source", "Title", "Summary", "URL"]
-    col_widths = [25, 30, 50, 80, 30]  # Adjust widths as needed
-    
-    # Header row
-    pdf.set_font("DejaVu", "B", 12)
-    for i, header in enumerate(headers):
-        pdf.cell(col_widths[i], 10, header, border=1)
-    pdf.ln()
-
-    # Data rows
-    pdf.set_font("DejaVu", "", 10)
-    for item in news_data:
-        row = [
-            item.get("publishedAt", "N/A")[:10],  # Only date part
-            item.get("source", "Unknown"),
-            item.get("title", "N/A"),
-            item.get("summary", "N/A"),
-            item.get("url", "")
-        ]
-        # Print each cell; use multi_cell for long text if needed.
-        cell_y = pdf.get_y()
-        max_height = 10
-        for i, data in enumerate(row):
-            x = pdf.get_x()
-            y = pdf.get_y()
-            pdf.multi_cell(col_widths[i], 10, data, border=1)
-            pdf.set_xy(x + col_widths[i], y)
-            max_height = max(max_height, pdf.get_y() - y)
-        pdf.ln(max_height)
-    
-    output_filename = f"{company_name}.pdf"
-    pdf.output(output_filename)
-    print(f"PDF generated: {output_filename}")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return await asyncio.gather(*[summarize_article(article, semaphore) for article in articles])
 
 def generate_html(company_name, news_data):
     """
     Generate an HTML file (companyname.html) with a table of news data.
     Each article includes: Published Date, Source, Title, Summary, and URL.
+    All article fields are HTML-escaped.
     """
     output_filename = f"{company_name}.html"
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{company_name} - Investment News Insights</title>
-<style>
-body {{
-    font-family: Arial, sans-serif;
-    margin: 20px;
-}}
-table {{
-    border-collapse: collapse;
-    width: 100%;
-}}
-th, td {{
-    border: 1px solid #ddd;
-    padding: 8px;
-}}
-th {{
-    background-color: #f2f2f2;
-    text-align: left;
-}}
-</style>
-</head>
-<body>
-<h2>{company_name} - Investment News Insights</h2>
-<table>
-<tr>
-<th>Date</th>
-<th>Source</th>
-<th>Title</th>
-<th>Summary</th>
-<th>URL</th>
-</tr>
-"""
+    parts = [HTML_HEADER.format(company_name=html.escape(company_name))]
     for item in news_data:
-        publishedAt = item.get("publishedAt", "N/A")[:10]
-        source = item.get("source", "Unknown")
-        title = item.get("title", "N/A")
-        summary = item.get("summary", "N/A")
-        url = item.get("url", "")
-        html_content += f"<tr><td>{publishedAt}</td><td>{source}</td><td>{title}</td><td>{summary}</td><td><a href='{url}'>Link</a></td></tr>"
-    
-    html_content += """
-</table>
-</body>
-</html>
-"""
+        publishedAt = html.escape(str(item.get("publishedAt", "N/A"))[:10])
+        source = html.escape(str(item.get("source", "Unknown")))
+        title = html.escape(str(item.get("title", "N/A")))
+        summary = html.escape(str(item.get("summary", "N/A")))
+        url = html.escape(str(item.get("url", "")))
+        parts.append(f"<tr><td>{publishedAt}</td><td>{source}</td><td>{title}</td><td>{summary}</td><td><a href='{url}'>Link</a></td></tr>")
+    parts.append(HTML_FOOTER)
+
     with open(output_filename, "w", encoding="utf-8") as f:
-        f.write(html_content)
+        f.write("".join(parts))
     print(f"HTML generated: {output_filename}")
+    return output_filename
+
+def generate_pdf(company_name, html_filename):
+    """
+    Generate a PDF file (companyname.pdf) from the HTML report using WeasyPrint.
+    Layout and text shaping run in native code and cover all Unicode characters.
+    """
+    # Imported here so a missing WeasyPrint (or its system libraries) only disables the PDF
+    from weasyprint import HTML
+
+    output_filename = f"{company_name}.pdf"
+    HTML(filename=html_filename).write_pdf(output_filename)
+    print(f"PDF generated: {output_filename}")
 
 def main():
     company = input("Enter company name: ")
@@ -235,8 +338,8 @@ def main():
     
     news_data = []
     print("Summarising news articles...")
-    for article in articles:
-        summary = summarize_article(article)
+    summaries = asyncio.run(summarize_articles(articles))
+    for article, summary in zip(articles, summaries):
         news_data.append({
             "publishedAt": article.get("publishedAt", "N/A"),
             "source": article.get("source", {}).get("name", "Unknown"),
@@ -245,13 +348,13 @@ def main():
             "url": article.get("url", "")
         })
     
-    print("Generating PDF with investment insights...")
+    print("Generating report with investment insights...")
+    html_filename = generate_html(company, news_data)
     try:
-        generate_pdf(company, news_data)
+        generate_pdf(company, html_filename)
     except Exception as e:
         print("PDF generation failed:", e)
-        print("Falling back to HTML output...")
-        generate_html(company, news_data)
+        print(f"The report is still available as HTML: {html_filename}")
 
 if __name__ == "__main__":
     main()